@@ -12,13 +12,17 @@ User defines
 #define MAX_BRIGHTNESS 255
 #define GLOBAL_BRIGHTNESS 255
 
-#define FIRMWARE_VER 3
+// 4: PIXEL_DATA is received into a back buffer and ACKed before it is shown
+#define FIRMWARE_VER 4
 #define SERIALRATE 12000000 // Full USB 1.1 speed (native USB)
 
 /***************************
 LEDs Setup
 ***************************/
-CRGB leds[NUM_STRIPS * NUM_LEDS_PER_STRIP];
+CRGB buffers[2][NUM_STRIPS * NUM_LEDS_PER_STRIP];
+CRGB *leds = buffers[0]; // front, being shown
+CRGB *back = buffers[1]; // back, being received into
+bool frame_ready = false;
 
 /***************************
 BiblioPixel Setup
@@ -111,11 +115,30 @@ inline void getData()
 
         if (cmd == CMDTYPE::PIXEL_DATA)
         {
-            Serial.readBytes(((char*)&leds), size); 
-    
             uint8_t resp = RETURN_CODES::SUCCESS;
 
-            LEDS.show();
+            // ACK as soon as the frame is in the back buffer; loop() shows
+            // it, so the host can send the next frame meanwhile. A short
+            // read is dropped instead of shown torn.
+            if (size > sizeof(buffers[0]))
+            {
+                // Drain the payload so the next command is parsed in sync
+                uint16_t left = size;
+                while (left > 0)
+                {
+                    uint16_t n = min(left, (uint16_t)sizeof(buffers[0]));
+                    size_t read = Serial.readBytes((char*)back, n);
+                    if (read == 0)
+                        break;
+                    left -= read;
+                }
+                resp = RETURN_CODES::ERROR_SIZE;
+            }
+            else if (Serial.readBytes((char*)back, size) != size)
+                resp = RETURN_CODES::ERROR_SIZE;
+            else
+                frame_ready = true;
+
             Serial.write(resp);
         }
         else if(cmd == CMDTYPE::GETID)
@@ -206,9 +229,27 @@ inline void getData()
 }
 
 
+inline void showFrame()
+{
+    if (!frame_ready)
+        return;
+
+    CRGB *temp = leds;
+    leds = back;
+    back = temp;
+    frame_ready = false;
+
+    // OctoWS2811 only waits here for the previous frame's DMA, then
+    // starts this one in the background.
+    LEDS[0].setLeds(leds, NUM_LEDS_PER_STRIP);
+    LEDS.show();
+}
+
+
 void loop()
 {
       getData();
+      showFrame();
 //      LEDS.delay(0);
 //    static uint8_t hue = 0;
 //    for(int i = 0; i < NUM_STRIPS; i++) {
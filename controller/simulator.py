@@ -0,0 +1,180 @@
+"""
+Host-side simulator of controller.ino, for testing drivers without a Teensy.
+
+Opens a pty that speaks the controller's serial protocol and prints its
+path; point a driver's `dev:` at it.
+
+    python controller/simulator.py --version 4 --id 0
+"""
+
+import argparse
+import os
+import select
+import struct
+import sys
+import threading
+import time
+import tty
+
+NUM_LEDS_PER_STRIP = 143
+NUM_STRIPS = 8
+MAX_BRIGHTNESS = 255
+FIRMWARE_VER = 4
+FRAME_SIZE = NUM_LEDS_PER_STRIP * NUM_STRIPS * 3
+
+# First firmware version that ACKs PIXEL_DATA before showing it
+BACK_BUFFER_VER = 4
+
+# WS2812B: 24 bits at 1.25us each, all strips in parallel
+SHOW_TIME = NUM_LEDS_PER_STRIP * 24 * 1.25e-6
+
+# Serial.setTimeout(1000)
+TIMEOUT = 1
+
+
+class CMDTYPE:
+    SETUP_DATA = 1
+    PIXEL_DATA = 2
+    BRIGHTNESS = 3
+    GETID = 4
+    SETID = 5
+    GETVER = 6
+
+
+class RETURN_CODES:
+    SUCCESS = 255
+    ERROR_SIZE = 1
+    ERROR_PIXEL_COUNT = 3
+    ERROR_BAD_CMD = 4
+
+
+class Simulator:
+    def __init__(self, version=FIRMWARE_VER, device_id=0, verbose=False):
+        self.version = version
+        self.device_id = device_id
+        self.verbose = verbose
+        self.brightness = MAX_BRIGHTNESS
+        self.frames = 0
+
+        self.leds = bytes(FRAME_SIZE)
+        self.show_done = 0
+
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        # Keeping our own handle on the slave stops reads on the master
+        # failing with EIO between client connections.
+        self.name = os.ttyname(self.slave)
+
+    def read(self, size):
+        """Like Serial.readBytes(): may return short after TIMEOUT."""
+        data = b''
+        deadline = time.time() + TIMEOUT
+        while len(data) < size:
+            left = deadline - time.time()
+            if left <= 0 or not select.select([self.master], [], [], left)[0]:
+                break
+            data += os.read(self.master, size - len(data))
+        return data
+
+    def write(self, *codes):
+        os.write(self.master, bytes(codes))
+
+    def show(self, leds):
+        """LEDS.show(): waits for the previous frame's transmit, if any."""
+        time.sleep(max(0, self.show_done - time.time()))
+        self.leds = leds
+        self.show_done = time.time() + SHOW_TIME
+        self.frames += 1
+
+    def run(self):
+        while True:
+            cmd = self.read(1)
+            if not cmd:
+                continue
+
+            cmd = cmd[0]
+            header = self.read(2).ljust(2, b'\0')
+            size, = struct.unpack('<H', header)
+            self.command(cmd, size)
+
+    def command(self, cmd, size):
+        if cmd == CMDTYPE.PIXEL_DATA:
+            if self.version < BACK_BUFFER_VER:
+                self.show(self.read(size))
+                self.write(RETURN_CODES.SUCCESS)
+            elif size > FRAME_SIZE:
+                self.read(size)  # drained, as the firmware does
+                self.write(RETURN_CODES.ERROR_SIZE)
+            else:
+                data = self.read(size)
+                if len(data) != size:
+                    self.write(RETURN_CODES.ERROR_SIZE)
+                else:
+                    self.write(RETURN_CODES.SUCCESS)
+                    self.show(data)
+
+        elif cmd == CMDTYPE.GETID:
+            self.write(self.device_id)
+
+        elif cmd == CMDTYPE.SETID:
+            if size != 1:
+                self.write(RETURN_CODES.ERROR_SIZE)
+            else:
+                # Serial.read() gives -1 on timeout, stored as 255
+                data = self.read(1)
+                self.device_id = data[0] if data else 255
+                self.write(RETURN_CODES.SUCCESS)
+
+        elif cmd == CMDTYPE.SETUP_DATA:
+            data = self.read(size)
+            result = RETURN_CODES.SUCCESS
+            if size != 4 or len(data) != size:
+                result = RETURN_CODES.ERROR_SIZE
+            else:
+                # ledtype and spi_speed are ignored, as in the firmware
+                pixel_count, = struct.unpack('<xHx', data)
+                if pixel_count // 3 != NUM_LEDS_PER_STRIP * NUM_STRIPS:
+                    result = RETURN_CODES.ERROR_PIXEL_COUNT
+            self.write(result)
+
+        elif cmd == CMDTYPE.BRIGHTNESS:
+            data = self.read(size)
+            if size != 1 or len(data) != size:
+                self.write(RETURN_CODES.ERROR_SIZE)
+            else:
+                self.brightness = min(MAX_BRIGHTNESS, data[0])
+                self.write(RETURN_CODES.SUCCESS)
+
+        elif cmd == CMDTYPE.GETVER:
+            self.write(RETURN_CODES.SUCCESS, self.version)
+
+        else:
+            self.write(RETURN_CODES.ERROR_BAD_CMD)
+
+        if self.verbose:
+            print('cmd %d size %d' % (cmd, size), file=sys.stderr)
+
+
+def report(sim, interval=5):
+    while True:
+        frames = sim.frames
+        time.sleep(interval)
+        print('%s: %.1f fps' % (sim.name, (sim.frames - frames) / interval),
+              file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--version', type=int, default=FIRMWARE_VER)
+    parser.add_argument('--id', type=int, default=0)
+    parser.add_argument('--verbose', '-v', action='store_true')
+    args = parser.parse_args()
+
+    sim = Simulator(args.version, args.id, args.verbose)
+    print(sim.name, flush=True)
+    threading.Thread(target=report, args=(sim,), daemon=True).start()
+    sim.run()
+
+
+if __name__ == '__main__':
+    main()
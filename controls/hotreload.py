@@ -0,0 +1,278 @@
+import copy
+import glob
+import importlib.util
+import os
+import sys
+import threading
+
+from bibliopixel.animation.failed import Failed
+from bibliopixel.animation.sequence import Sequence
+from bibliopixel.control.control import Control
+from bibliopixel.project import aliases, load, recurse
+from bibliopixel.util import data_file, log
+
+
+class HotReload(Control):
+    """
+    Watches the project file and the animation sources, and swaps in
+    rebuilt animations without restarting the project.
+
+    Only the animations whose config or source changed are rebuilt.
+    Drivers and layout are never touched, so the serial connections and
+    the coord_map stay alive; changes to those sections still need a
+    restart.  The swap is queued on the project's edit queue, so it
+    happens at a frame boundary.
+    """
+
+    def __init__(self, *args,
+                 filename='wonderdomicile.yml',
+                 watch=('animations/*.py',),
+                 interval=0.5,
+                 **kwds):
+
+        # Project file to reparse, relative to the project root
+        self.filename = filename
+
+        # Globs of animation sources to watch, relative to the project root
+        self.watch = [watch] if isinstance(watch, str) else list(watch)
+
+        # Seconds between polls of the watched files
+        self.interval = interval
+
+        super().__init__(*args, **kwds)
+
+    def set_project(self, project):
+        super().set_project(project)
+        self.project = project
+        self.root = os.path.abspath(os.path.dirname(load.ROOT_FILE or ''))
+
+        # The files and config last applied; changes are diffed against
+        # these until a reload of them succeeds.
+        self.mtimes = self._stat()
+        self.desc = self._load()
+        self.entries = _named(self.desc['animation'].get('animations', []))
+
+    def _make_thread(self):
+        return threading.Thread(target=self._loop, daemon=True)
+
+    def _loop(self):
+        last = failed = self.mtimes
+        while not self.stop_event.wait(self.interval):
+            mtimes = self._stat()
+
+            # Wait for the files to settle so a half-written rsync
+            # doesn't get loaded, and don't retry a failed reload until
+            # something changes again.
+            if mtimes not in (self.mtimes, failed) and mtimes == last:
+                try:
+                    self._reload(mtimes)
+                    self.mtimes = mtimes
+                except Exception:
+                    log.exception('Unable to reload %s', self.filename)
+                    failed = mtimes
+            last = mtimes
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def _stat(self):
+        files = [self._path(self.filename)]
+        for pattern in self.watch:
+            files.extend(sorted(glob.glob(self._path(pattern))))
+
+        mtimes = {}
+        for f in files:
+            try:
+                mtimes[f] = os.stat(f).st_mtime
+            except OSError:
+                pass
+        return mtimes
+
+    def _load(self):
+        return data_file.load(self._path(self.filename))
+
+    def _reload(self, mtimes):
+        changed = {f for f in mtimes if mtimes[f] != self.mtimes.get(f)}
+        desc = self._load()
+        old = self.desc
+
+        for section in sorted(set(old) | set(desc)):
+            if section != 'animation' and (
+                    old.get(section) != desc.get(section)):
+                log.warning('Section "%s" changed, restart needed', section)
+
+        animation, old_animation = desc['animation'], old['animation']
+        for key in sorted(set(animation) | set(old_animation)):
+            if key != 'animations' and (
+                    animation.get(key) != old_animation.get(key)):
+                log.warning('animation.%s changed, restart needed', key)
+
+        top = self.project.animation
+        if not isinstance(top, Sequence):
+            log.warning('Can only reload animations inside a sequence')
+            self.desc = desc
+            return
+
+        entries = _named(animation.get('animations', []))
+        running = {a.name: a for a in top.animations}
+
+        with load.extender(self.project.path):
+            # Changed sources are loaded into new module objects, so the
+            # animations still running keep the code they were built from.
+            modules = _load_modules(entries, changed)
+
+            rebuild = [
+                name for name, entry in entries.items()
+                if entry != self.entries.get(name)
+                or name not in running
+                or isinstance(running[name], Failed)
+                or _module_name(entry) in modules]
+
+            built = self._build(rebuild, entries, modules,
+                                animation.get('run', {}))
+
+        keep = [n for n in entries if n in built or n in running]
+        if not keep:
+            raise ValueError('No animations left after reload')
+
+        if built or set(keep) != set(running):
+            log.info('Reloading %s', ', '.join(sorted(built)) or 'sequence')
+            top.edit_queue.put_edit(self._swap, built, set(keep), modules)
+
+        # Entries that failed to build are left as they were, so they are
+        # tried again on the next reload.
+        applied = dict(self.entries)
+        applied.update((n, entries[n]) for n in built)
+        self.entries = {n: applied.get(n, entries[n]) for n in keep}
+        self.desc = desc
+
+    def _build(self, names, entries, modules, run):
+        if not names:
+            return {}
+
+        animations = []
+        for name in names:
+            entry = entries[name]
+            if isinstance(entry, str):
+                entry = {'typename': entry}
+            entry = dict(copy.deepcopy(entry), name=name)
+
+            module = modules.get(_module_name(entry))
+            if module:
+                cls = entry.pop('typename').split('.')[-1]
+                entry['datatype'] = getattr(module, cls)
+
+            animations.append(entry)
+
+        # Go through the same two recursion passes as Project does, so
+        # fps inheritance, field conversion and construction all match.
+        desc = {
+            'datatype': Sequence,
+            'run': copy.deepcopy(run),
+            'animations': animations,
+        }
+        path = 'bibliopixel.animation'
+        desc = recurse.recurse(desc, python_path=path)
+
+        def post(desc):
+            return self.project.construct_child('animation', **desc)
+
+        sequence = recurse.recurse(desc, pre=None, post=post, python_path=path)
+
+        built = {}
+        for a in sequence.animations:
+            if isinstance(a, Failed):
+                log.error('Keeping the previous version of %s', a.name)
+                continue
+            a.top_level = False
+            a.set_project(self.project)
+            built[a.name] = a
+
+        return built
+
+    def _swap(self, built, keep, modules):
+        """Runs on the animation thread, between two frames."""
+        sys.modules.update(modules)
+
+        top = self.project.animation
+        current = top.animation
+        running = [a.name for a in top.animations]
+
+        # Keep the running order, which a random sequence has shuffled;
+        # new animations go at the end.
+        animations = [built.get(a.name, a) for a in top.animations
+                      if a.name in keep]
+        animations += [a for n, a in built.items() if n not in running]
+        top.animations = type(top.animations)(animations)
+
+        if current is None:
+            return
+
+        if current in animations:
+            top._index = animations.index(current)
+        else:
+            # The running animation was replaced or removed: finish it
+            # and start whatever is now in its slot.
+            top.frames.close()
+            names = [a.name for a in animations]
+            if current.name in names:
+                top.index = names.index(current.name)
+            else:
+                top.index = top.index
+
+
+def _named(animations):
+    """
+    Key the raw animation entries by the name the sequence gives them,
+    following collection._make_names_unique.
+    """
+    def name(entry):
+        if isinstance(entry, str):
+            return entry.split('.')[-1]
+        return entry.get('name') or entry.get('typename', '').split('.')[-1]
+
+    names = [name(a) for a in animations]
+    counts = {n: names.count(n) for n in names}
+    seen = {}
+    result = {}
+    for n, a in zip(names, animations):
+        if counts[n] > 1:
+            seen[n] = seen.get(n, -1) + 1
+            n = '%s_%d' % (n, seen[n])
+        result[n] = a
+
+    return result
+
+
+def _module_name(entry):
+    if isinstance(entry, str):
+        entry = {'typename': entry}
+    typename = aliases.resolve(entry.get('typename', ''))
+    return typename.rpartition('.')[0]
+
+
+def _load_modules(entries, files):
+    """
+    Load a new module object for each changed source that an entry's
+    typename refers to.  sys.modules is left alone until the swap.
+    """
+    files = {os.path.abspath(f) for f in files if f.endswith('.py')}
+    modules = {}
+
+    for entry in entries.values():
+        name = _module_name(entry)
+        if not name or name in modules:
+            continue
+
+        try:
+            spec = importlib.util.find_spec(name)
+        except (ImportError, ValueError):
+            continue
+
+        if spec and spec.origin and os.path.abspath(spec.origin) in files:
+            spec = importlib.util.spec_from_file_location(name, spec.origin)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            modules[name] = module
+
+    return modules
@@ -0,0 +1,66 @@
+from bibliopixel.drivers.return_codes import RETURN_CODES, print_error
+from bibliopixel.drivers.serial.codes import CMDTYPE
+from bibliopixel.drivers.serial.driver import Serial
+from bibliopixel.util import log, util
+
+# First controller.ino version that ACKs PIXEL_DATA before showing it
+BACK_BUFFER_VER = 4
+
+
+class Teensy(Serial):
+    """
+    Serial driver for controller/controller.ino.
+
+    Firmware from BACK_BUFFER_VER on receives into a back buffer and ACKs
+    before showing, so against it the ACK for a frame is only read right
+    before the next frame is sent. The next frame's rendering and transfer
+    then overlap with the Teensy showing the current one.
+    """
+
+    def __init__(self, *args, hardwareID='16C0:0483', **kwds):
+        self._pending = False
+        super().__init__(*args, hardwareID=hardwareID, **kwds)
+        self.device_version = self._get_version()
+        self._pipelined = self.device_version >= BACK_BUFFER_VER
+        log.info('%s: firmware version %s%s', self.dev, self.device_version,
+                 ', pipelined' if self._pipelined else '')
+
+    def _get_version(self):
+        self._write(util.generate_header(CMDTYPE.GETVER, 0))
+        if self._read() == RETURN_CODES.SUCCESS:
+            return self._read() or 0
+        return 0
+
+    def _read_ack(self):
+        if not self._pending:
+            return True
+
+        self._pending = False
+        code = self._read()
+        if code is None:
+            self.devices.error(fail=False)
+        elif code != RETURN_CODES.SUCCESS:
+            print_error(code)
+        else:
+            return True
+
+    def set_device_brightness(self, brightness):
+        self._read_ack()
+        return super().set_device_brightness(brightness)
+
+    def _send_packet(self):
+        if not self._pipelined:
+            return super()._send_packet()
+
+        if not self._com:
+            return
+
+        ok = self._read_ack()
+        self._write(self._packet)
+        self._pending = True
+        return ok
+
+    def cleanup(self):
+        if self._com:
+            self._read_ack()
+        super().cleanup()